@@ -2,14 +2,17 @@ import os
 import sys
 import time
 import uuid
-import json
+import atexit
 import random
 import logging
 import asyncio
 import argparse
+import orjson
+from collections import OrderedDict
+from dataclasses import dataclass
 from quart import Quart, request, jsonify
 from camoufox.async_api import AsyncCamoufox
-from patchright.async_api import async_playwright
+from patchright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
 
 COLORS = {
@@ -51,6 +54,18 @@ handler = logging.StreamHandler(sys.stdout)
 logger.addHandler(handler)
 
 
+@dataclass
+class TurnstileResult:
+    """Outcome of a finished solve, with its /result response body serialized once."""
+    __slots__ = ("value", "elapsed_time", "body")
+
+    value: str
+    elapsed_time: float
+
+    def __post_init__(self):
+        self.body = orjson.dumps({"value": self.value, "elapsed_time": self.elapsed_time})
+
+
 class TurnstileAPIServer:
     HTML_TEMPLATE = """
     <!DOCTYPE html>
@@ -88,44 +103,275 @@ class TurnstileAPIServer:
     </html>
     """
 
+    CLEAR_STORAGE_SCRIPT = """
+    async () => {
+        try { localStorage.clear(); } catch (e) {}
+        try { sessionStorage.clear(); } catch (e) {}
+        try {
+            for (const db of await indexedDB.databases()) {
+                indexedDB.deleteDatabase(db.name);
+            }
+        } catch (e) {}
+    }
+    """
+
+    RESULTS_FILE = "results.jsonl"
+    RESULTS_COMPACT_SIZE = 10 * 1024 * 1024
+    PROXY_SCHEMES = ('http', 'https', 'socks4', 'socks5')
+    FLUSH_INTERVAL = 5
+    MAX_RESULTS = 10000
+    RESULT_TTL = 3600
+    BROWSER_POOL_RECYCLE_AFTER = 100
+
     def __init__(self, headless: bool, useragent: str, debug: bool, browser_type: str, thread: int, proxy_support: bool):
         self.app = Quart(__name__)
         self.debug = debug
-        self.results = self._load_results()
+        self.results, self._result_times = self._load_results()
+        self._dirty_keys = {}
+        self._compacted_size = 0
+        self._results_lock = asyncio.Lock()
+        self._flush_task = None
+        self.jobs = None
+        self._workers = []
         self.browser_type = browser_type
         self.headless = headless
         self.useragent = useragent
         self.thread_count = thread
         self.proxy_support = proxy_support
-        self.browser_pool = asyncio.Queue()
+        self._proxies: list = []
+        self._proxies_mtime: float = 0.0
+        self.browser = None
+        self.context_pool = asyncio.Queue()
+        self._browser_lock = asyncio.Lock()
+        self._browser_users = {}
+        self._browser_solves = 0
+        self._playwright = None
+        self._camoufox_managers = {}
+        tpl_prefix, tpl_suffix = self.HTML_TEMPLATE.split("<!-- cf turnstile -->", 1)
+        self._template_bytes_prefix = tpl_prefix.encode()
+        self._template_bytes_suffix = tpl_suffix.encode()
         self.browser_args = []
+        self._default_context_options = {}
         if useragent:
             self.browser_args.append(f"--user-agent={useragent}")
+            self._default_context_options["user_agent"] = useragent
 
         self._setup_routes()
 
-    @staticmethod
-    def _load_results():
-        """Load previous results from results.json."""
+    @classmethod
+    def _load_results(cls):
+        """Rebuild results and their store times from the results.jsonl log, keeping the most recent unexpired MAX_RESULTS."""
+        results = OrderedDict()
+        result_times = {}
+        cutoff = time.time() - cls.RESULT_TTL
         try:
-            if os.path.exists("results.json"):
-                with open("results.json", "r") as f:
-                    return json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
+            if os.path.exists(cls.RESULTS_FILE):
+                with open(cls.RESULTS_FILE, "rb") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            entry = orjson.loads(line)
+                            task_id, stored_at = entry["task_id"], entry["stored_at"]
+                            result = TurnstileResult(**entry["result"])
+                        except (orjson.JSONDecodeError, KeyError, TypeError):
+                            logger.warning("Skipping malformed line in results log")
+                            continue
+
+                        if stored_at <= cutoff:
+                            results.pop(task_id, None)
+                            result_times.pop(task_id, None)
+                            continue
+
+                        results[task_id] = result
+                        results.move_to_end(task_id)
+                        result_times[task_id] = stored_at
+        except IOError as e:
             logger.warning(f"Error loading results: {str(e)}. Starting with an empty results dictionary.")
-        return {}
 
-    def _save_results(self):
-        """Save results to results.json."""
+        while len(results) > cls.MAX_RESULTS:
+            evicted, _ = results.popitem(last=False)
+            result_times.pop(evicted, None)
+        return results, result_times
+
+    def _store_result(self, task_id: str, result, persist: bool = True) -> None:
+        """Store a task result, evicting the least recently stored ones beyond MAX_RESULTS."""
+        self.results[task_id] = result
+        self.results.move_to_end(task_id)
+        self._result_times[task_id] = time.time()
+
+        while len(self.results) > self.MAX_RESULTS:
+            evicted, _ = self.results.popitem(last=False)
+            self._result_times.pop(evicted, None)
+
+        if persist:
+            # Used as an ordered set, so the log keeps the store order
+            self._dirty_keys.pop(task_id, None)
+            self._dirty_keys[task_id] = None
+
+    def _evict_expired_results(self) -> None:
+        """Drop results older than RESULT_TTL seconds."""
+        cutoff = time.time() - self.RESULT_TTL
+
+        while self.results:
+            task_id = next(iter(self.results))
+            if self._result_times.get(task_id, 0) > cutoff:
+                break
+            del self.results[task_id]
+            self._result_times.pop(task_id, None)
+
+    def _serialize_entry(self, task_id: str) -> bytes:
+        """Serialize one result with its store time as a results.jsonl line."""
+        return orjson.dumps({"task_id": task_id, "stored_at": self._result_times[task_id], "result": self.results[task_id]}) + b"\n"
+
+    def _serialize_results(self) -> bytes:
+        """Serialize every resident finished result as results.jsonl lines."""
+        return b"".join(
+            self._serialize_entry(task_id)
+            for task_id, result in self.results.items()
+            if isinstance(result, TurnstileResult)
+        )
+
+    def _take_pending(self):
+        """Take the task ids changed since the last flush, returning them with their serialized results."""
+        keys, self._dirty_keys = self._dirty_keys, {}
+        data = b"".join(
+            self._serialize_entry(task_id)
+            for task_id in keys
+            if task_id in self.results
+        )
+        return keys, data
+
+    def _restore_pending(self, keys: dict) -> None:
+        """Mark task ids dirty again after a failed write, ahead of those stored since."""
+        restored = dict.fromkeys(task_id for task_id in keys if task_id not in self._dirty_keys)
+        restored.update(self._dirty_keys)
+        self._dirty_keys = restored
+
+    @classmethod
+    def _append_results(cls, data: bytes) -> int:
+        """Append serialized results to results.jsonl and return the resulting file size, or None on failure."""
         try:
-            with open("results.json", "w") as result_file:
-                json.dump(self.results, result_file, indent=4)
+            with open(cls.RESULTS_FILE, "ab") as result_file:
+                result_file.write(data)
+                result_file.flush()
+                os.fsync(result_file.fileno())
+                return result_file.tell()
         except IOError as e:
             logger.error(f"Error saving results to file: {str(e)}")
+            return None
+
+    @classmethod
+    def _write_results(cls, data: bytes) -> bool:
+        """Atomically and durably replace results.jsonl with the given serialized results."""
+        tmp_path = cls.RESULTS_FILE + ".tmp"
+        try:
+            with open(tmp_path, "wb") as result_file:
+                result_file.write(data)
+                result_file.flush()
+                os.fsync(result_file.fileno())
+            os.replace(tmp_path, cls.RESULTS_FILE)
+            return True
+        except IOError as e:
+            logger.error(f"Error compacting results file: {str(e)}")
+            return False
+
+    def _flush_results_sync(self):
+        """Append results stored since the last flush."""
+        if self._dirty_keys:
+            keys, data = self._take_pending()
+            if self._append_results(data) is None:
+                self._restore_pending(keys)
+
+    async def _flush_results(self):
+        """Append pending results off the event loop, compacting the log once it outgrows the live results."""
+        async with self._results_lock:
+            if not self._dirty_keys:
+                return
+
+            loop = asyncio.get_running_loop()
+            keys, data = self._take_pending()
+            size = await loop.run_in_executor(None, self._append_results, data)
+            if size is None:
+                self._restore_pending(keys)
+                return
+
+            # Compact past RESULTS_COMPACT_SIZE or twice the size left by the last compaction, whichever is larger,
+            # so a live set above the fixed threshold does not trigger a full rewrite on every flush
+            if size > max(self.RESULTS_COMPACT_SIZE, 2 * self._compacted_size):
+                if self.debug:
+                    logger.debug(f"Compacting results log ({size} bytes)")
+                data = self._serialize_results()
+                if await loop.run_in_executor(None, self._write_results, data):
+                    self._compacted_size = len(data)
+
+    async def _flush_loop(self):
+        """Periodically flush results to disk instead of on every solve."""
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            self._evict_expired_results()
+            await self._flush_results()
+
+    @classmethod
+    def _parse_proxy(cls, proxy: str):
+        """Parse a proxy string into a Playwright proxy dict, or None if the format is invalid."""
+        if '://' in proxy:
+            # Format: scheme://host:port[:username:password]
+            proxy_scheme, proxy = proxy.split('://', 1)
+        else:
+            proxy_scheme = "http"
+
+        parts = proxy.split(':')
+        if parts[0] in cls.PROXY_SCHEMES and len(parts) >= 5:
+            # Format: scheme:host:port:username:password
+            proxy_scheme = parts.pop(0)
+
+        if len(parts) == 2:
+            # Format: host:port
+            proxy_host, proxy_port = parts
+            return {"server": f"{proxy_scheme}://{proxy_host}:{proxy_port}"}
+        elif len(parts) == 3:
+            # Format: host:port:scheme
+            proxy_host, proxy_port, proxy_scheme = parts
+            return {"server": f"{proxy_scheme}://{proxy_host}:{proxy_port}"}
+        elif len(parts) >= 4:
+            # Format: host:port:username:password (username may contain colons, split on the last one)
+            proxy_host, proxy_port = parts[0], parts[1]
+            proxy_user, _, proxy_pass = ':'.join(parts[2:]).rpartition(':')
+            return {"server": f"{proxy_scheme}://{proxy_host}:{proxy_port}", "username": proxy_user, "password": proxy_pass}
+
+        return None
+
+    @staticmethod
+    def _read_proxies_file(proxy_file_path: str) -> list:
+        """Read the non-empty lines of the proxy file."""
+        with open(proxy_file_path) as proxy_file:
+            return [line.strip() for line in proxy_file if line.strip()]
+
+    async def _get_proxies(self) -> list:
+        """Return parsed proxies from proxies.txt, re-reading the file only when it changes."""
+        proxy_file_path = os.path.join(os.getcwd(), "proxies.txt")
+        mtime = os.stat(proxy_file_path).st_mtime
+
+        if mtime != self._proxies_mtime:
+            lines = await asyncio.get_running_loop().run_in_executor(None, self._read_proxies_file, proxy_file_path)
+
+            self._proxies = []
+            for line in lines:
+                parsed = self._parse_proxy(line)
+                if parsed:
+                    self._proxies.append(parsed)
+                else:
+                    logger.error(f"Invalid proxy format in proxies.txt: {line}")
+            self._proxies_mtime = mtime
+
+        return self._proxies
 
     def _setup_routes(self) -> None:
         """Set up the application routes."""
         self.app.before_serving(self._startup)
+        self.app.after_serving(self._shutdown)
+        atexit.register(self._flush_results_sync)
         self.app.route('/turnstile', methods=['GET'])(self.process_turnstile)
         self.app.route('/result', methods=['GET'])(self.get_result)
         self.app.route('/')(self.index)
@@ -139,202 +385,264 @@ class TurnstileAPIServer:
             logger.error(f"Failed to initialize browser: {str(e)}")
             raise
 
+        self.jobs = asyncio.Queue(maxsize=self.thread_count * 4)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.thread_count)]
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _shutdown(self) -> None:
+        """Stop the flush loop, persist any pending results and close the browsers."""
+        for worker in self._workers:
+            worker.cancel()
+        # Let cancelled solves finish their cleanup before the browsers go away
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._flush_task:
+            self._flush_task.cancel()
+        await self._flush_results()
+
+        for browser in list(self._browser_users):
+            await self._close_browser(browser)
+
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def _worker(self) -> None:
+        """Consume queued solve jobs one at a time."""
+        while True:
+            job = await self.jobs.get()
+            try:
+                await self._solve_turnstile(**job)
+            except Exception as e:
+                logger.error(f"Unexpected error in solve worker: {str(e)}")
+            finally:
+                self.jobs.task_done()
+
     async def _initialize_browser(self) -> None:
-        """Initialize the browser and create the page pool."""
+        """Launch the shared browser and create the pool of reusable contexts."""
 
         if self.browser_type in ['chromium', 'chrome', 'msedge']:
-            playwright = await async_playwright().start()
-        elif self.browser_type == "camoufox":
-            headlessMode = 'virtual' if self.headless else False
-            camoufox = AsyncCamoufox(headless=headlessMode, geoip=True, humanize=True)
-
-        for _ in range(self.thread_count):
-            if self.browser_type in ['chromium', 'chrome', 'msedge']:
-                browser = await playwright.chromium.launch(
-                    channel=self.browser_type,
-                    headless=self.headless,
-                    args=self.browser_args
-                )
+            self._playwright = await async_playwright().start()
 
-            elif self.browser_type == "camoufox":
-                browser = await camoufox.start()
+        self.browser = await self._launch_browser()
 
-            await self.browser_pool.put((_+1, browser))
+        for index in range(1, self.thread_count + 1):
+            context = await self._new_default_context(self.browser)
+            await self.context_pool.put((index, self.browser, context))
 
             if self.debug:
-                logger.success(f"Browser {_ + 1} initialized successfully")
+                logger.success(f"Context {index} initialized successfully")
+
+        logger.success(f"Context pool initialized with {self.context_pool.qsize()} contexts")
+
+    async def _launch_browser(self):
+        """Launch a new browser instance of the configured type."""
+        if self.browser_type in ['chromium', 'chrome', 'msedge']:
+            return await self._playwright.chromium.launch(
+                channel=self.browser_type,
+                headless=self.headless,
+                args=self.browser_args
+            )
+
+        # Each launch gets its own manager, it owns the Playwright driver that must be stopped with the browser
+        headlessMode = 'virtual' if self.headless else False
+        camoufox = AsyncCamoufox(headless=headlessMode, geoip=True, humanize=True)
+        browser = await camoufox.start()
+        self._camoufox_managers[browser] = camoufox
+        return browser
+
+    async def _close_browser(self, browser) -> None:
+        """Close a browser, stopping the Camoufox driver that launched it if any."""
+        camoufox = self._camoufox_managers.pop(browser, None)
+        if camoufox:
+            await camoufox.__aexit__(None, None, None)
+        else:
+            await browser.close()
+
+    async def _new_default_context(self, browser):
+        """Create a long-lived context on the given browser with the global settings."""
+        context = await browser.new_context(**self._default_context_options)
+        self._browser_users[browser] = self._browser_users.get(browser, 0) + 1
+        return context
+
+    async def _retire_context(self, browser, context) -> None:
+        """Close a pooled context of a retired browser, closing the browser with its last context."""
+        self._browser_users[browser] -= 1
+        last_user = not self._browser_users[browser]
+        if last_user:
+            del self._browser_users[browser]
 
-        logger.success(f"Browser pool initialized with {self.browser_pool.qsize()} browsers")
+        try:
+            await context.close()
+        except Exception as e:
+            logger.error(f"Error closing retired context: {str(e)}")
 
+        if last_user:
+            try:
+                await self._close_browser(browser)
+            except Exception as e:
+                logger.error(f"Error closing retired browser: {str(e)}")
+
+    async def _release_context(self, index: int, browser, context) -> None:
+        """Return a pooled context, moving it to a fresh browser once BROWSER_POOL_RECYCLE_AFTER solves were served."""
+        async with self._browser_lock:
+            try:
+                if browser is self.browser and self._browser_solves >= self.BROWSER_POOL_RECYCLE_AFTER:
+                    self._browser_solves = 0
+                    self.browser = await self._launch_browser()
+
+                    if self.debug:
+                        logger.debug("Recycled browser to bound memory usage")
+
+                if browser is not self.browser:
+                    # Keep the old context if the new one cannot be created, the old browser stays alive for it
+                    new_context = await self._new_default_context(self.browser)
+                    await self._retire_context(browser, context)
+                    browser, context = self.browser, new_context
+            except Exception as e:
+                logger.error(f"Context {index}: Error recycling browser, keeping the current context: {str(e)}")
+            finally:
+                self.context_pool.put_nowait((index, browser, context))
 
     async def _solve_turnstile(self, task_id: str, url: str, sitekey: str, action: str = None, cdata: str = None, proxy: str = None, useragent: str = None):
         """Solve the Turnstile challenge."""
-        used_proxy = None
+        index, browser, context = await self.context_pool.get()
+        self._browser_solves += 1
+        try:
+            await self._run_solve(index, browser, context, task_id, url, sitekey, action, cdata, proxy, useragent)
+        finally:
+            await self._release_context(index, browser, context)
 
-        index, browser = await self.browser_pool.get()
+    async def _new_override_context(self, index: int, browser, proxy: str = None, useragent: str = None):
+        """Return a short-lived context for proxy or user agent overrides (None if the pooled one fits) and the proxy used."""
+        used_proxy = None
 
         # Use proxy from API parameter if provided, otherwise fallback to file-based proxy selection
         if proxy:
             # Proxy provided via API
-            used_proxy = proxy
-            if self.debug:
-                logger.debug(f"Browser {index}: Using API-provided proxy: {proxy}")
+            used_proxy = self._parse_proxy(proxy)
+            if used_proxy is None:
+                logger.error(f"Context {index}: Invalid proxy format: {proxy}")
+            elif self.debug:
+                logger.debug(f"Context {index}: Using API-provided proxy: {proxy}")
         elif self.proxy_support:
             # Fallback to file-based proxy selection
-            proxy_file_path = os.path.join(os.getcwd(), "proxies.txt")
-            
             try:
-                with open(proxy_file_path) as proxy_file:
-                    proxies = [line.strip() for line in proxy_file if line.strip()]
-
+                proxies = await self._get_proxies()
                 used_proxy = random.choice(proxies) if proxies else None
                 if self.debug and used_proxy:
-                    logger.debug(f"Browser {index}: Using file-based proxy: {used_proxy}")
+                    logger.debug(f"Context {index}: Using file-based proxy: {used_proxy['server']}")
             except FileNotFoundError:
                 if self.debug:
-                    logger.warning(f"Browser {index}: proxies.txt file not found, proceeding without proxy")
+                    logger.warning(f"Context {index}: proxies.txt file not found, proceeding without proxy")
 
-        # Determine user agent to use - API parameter takes precedence over global setting
+        # API parameter takes precedence over global setting
         effective_useragent = useragent or self.useragent
-        
-        # Configure browser context with proxy and user agent if available
-        context_options = {}
-        
+
+        if not used_proxy and effective_useragent == self.useragent:
+            return None, None
+
+        context_options = dict(self._default_context_options)
+
         if used_proxy:
-            # Check for scheme://host:port format first
-            if '://' in used_proxy:
-                parts = proxy.split(':')
-                proxy_scheme, proxy_ip, proxy_port, proxy_user, proxy_pass = parts
-                context_options["proxy"] = {"server": f"{proxy_scheme}://{proxy_ip}:{proxy_port}", "username": proxy_user, "password": proxy_pass}
-            else:
-                parts = used_proxy.split(':')
-                if len(parts) == 2:
-                    # Format: host:port
-                    proxy_host, proxy_port = parts
-                    context_options["proxy"] = {"server": f"http://{proxy_host}:{proxy_port}"}
-                elif len(parts) == 3:
-                    # Format: host:port:scheme
-                    proxy_host, proxy_port, proxy_scheme = parts
-                    context_options["proxy"] = {"server": f"{proxy_scheme}://{proxy_host}:{proxy_port}"}
-                elif len(parts) >= 4:
-                    # Format: host:port:username:password (username/password may contain colons)
-                    proxy_host = parts[0]
-                    proxy_port = parts[1]
-                    
-                    # Join the remaining parts and split on the last colon to separate username and password
-                    remaining = ':'.join(parts[2:])
-                    if ':' in remaining:
-                        # Find the last colon to separate username and password
-                        last_colon_idx = remaining.rfind(':')
-                        proxy_user = remaining[:last_colon_idx]
-                        proxy_pass = remaining[last_colon_idx + 1:]
-                    else:
-                        # No password, only username
-                        proxy_user = remaining
-                        proxy_pass = ""
-                    
-                    context_options["proxy"] = {
-                        "server": f"http://{proxy_host}:{proxy_port}", 
-                        "username": proxy_user, 
-                        "password": proxy_pass
-                    }
-                else:
-                    logger.error(f"Browser {index}: Invalid proxy format: {used_proxy}")
-        
+            context_options["proxy"] = used_proxy
+
         if effective_useragent:
             context_options["user_agent"] = effective_useragent
             if self.debug:
-                logger.debug(f"Browser {index}: Using user agent: {effective_useragent}")
-        
-        context = await browser.new_context(**context_options)
+                logger.debug(f"Context {index}: Using user agent: {effective_useragent}")
 
-        page = await context.new_page()
+        return await browser.new_context(**context_options), used_proxy
 
+    async def _run_solve(self, index: int, browser, context, task_id: str, url: str, sitekey: str, action: str = None, cdata: str = None, proxy: str = None, useragent: str = None):
+        """Solve the Turnstile challenge, in the pooled context unless the request overrides proxy or user agent."""
+        solve_context, used_proxy, page = None, None, None
         start_time = time.time()
 
         try:
+            if proxy or self.proxy_support or (useragent and useragent != self.useragent):
+                solve_context, used_proxy = await self._new_override_context(index, browser, proxy, useragent)
+
+            page = await (solve_context or context).new_page()
+
             if self.debug:
-                logger.debug(f"Browser {index}: Starting Turnstile solve for URL: {url} with Sitekey: {sitekey} | Proxy: {used_proxy}")
-                logger.debug(f"Browser {index}: Setting up page data and route")
+                logger.debug(f"Context {index}: Starting Turnstile solve for URL: {url} with Sitekey: {sitekey} | Proxy: {used_proxy['server'] if used_proxy else None}")
+                logger.debug(f"Context {index}: Setting up page data and route")
 
             url_with_slash = url + "/" if not url.endswith("/") else url
             turnstile_div = f'<div class="cf-turnstile" data-sitekey="{sitekey}" data-callback="onCaptchaSuccess"' + (f' data-action="{action}"' if action else '') + (f' data-cdata="{cdata}"' if cdata else '') + '></div>'
-            page_data = self.HTML_TEMPLATE.replace("<!-- cf turnstile -->", turnstile_div)
+            page_data = self._template_bytes_prefix + turnstile_div.encode() + self._template_bytes_suffix
 
-            await page.route(url_with_slash, lambda route: route.fulfill(body=page_data, status=200))
-            await page.goto(url_with_slash)
+            # Serve the page from the target origin, Turnstile checks the sitekey against it
+            await page.route(url_with_slash, lambda route: route.fulfill(body=page_data, status=200, content_type="text/html; charset=utf-8", headers={"cache-control": "no-store"}))
 
             if self.debug:
-                logger.debug(f"Browser {index}: Waiting for DOM Content Loaded")
-            await page.wait_for_load_state("domcontentloaded")
-            if self.debug:
-                logger.debug(f"Browser {index}: Waiting for network idle")
-            await page.wait_for_load_state("networkidle")
+                logger.debug(f"Context {index}: Loading page")
+            # The default "load" wait also covers the async Turnstile script, which DOMContentLoaded would not
+            await page.goto(url_with_slash)
+
+            widget = page.locator(".cf-turnstile")
+            response_input = page.locator("[name=cf-turnstile-response]")
 
             if self.debug:
-                logger.debug(f"Browser {index}: Setting up Turnstile widget dimensions")
+                logger.debug(f"Context {index}: Setting up Turnstile widget dimensions")
 
-            await page.eval_on_selector("//div[@class='cf-turnstile']", "el => el.style.width = '70px'")
+            await widget.evaluate("el => el.style.width = '70px'")
 
             if self.debug:
-                logger.debug(f"Browser {index}: Starting Turnstile response retrieval loop")
+                logger.debug(f"Context {index}: Waiting for Turnstile callback")
 
-            for _ in range(20):
-                try:
-                    turnstile_check = await page.input_value("[name=cf-turnstile-response]", timeout=2000)
-                    if turnstile_check == "":
-                        if self.debug:
-                            logger.debug(f"Browser {index}: Attempt {_} - No Turnstile response yet")
-                        
-                        await page.locator("//div[@class='cf-turnstile']").click(timeout=1000)
-                        await asyncio.sleep(0.5)
-                    else:
-                        elapsed_time = round(time.time() - start_time, 3)
-
-                        logger.success(f"Browser {index}: Successfully solved captcha - {COLORS.get('MAGENTA')}{turnstile_check[:10]}{COLORS.get('RESET')} in {COLORS.get('GREEN')}{elapsed_time}{COLORS.get('RESET')} Seconds")
-
-                        self.results[task_id] = {"value": turnstile_check, "elapsed_time": elapsed_time}
-                        self._save_results()
-                        break
-                except:
-                    pass
-
-            # Fallback check using window.turnstileToken if primary method didn't find token
-            if self.results.get(task_id) == "CAPTCHA_NOT_READY":
-                try:
-                    if self.debug:
-                        logger.debug(f"Browser {index}: Attempting fallback using window.turnstileToken")
-                    
-                    window_token = await page.evaluate("window.turnstileToken")
-                    if window_token and window_token != "":
-                        elapsed_time = round(time.time() - start_time, 3)
-                        
-                        logger.success(f"Browser {index}: Successfully solved captcha via fallback - {COLORS.get('MAGENTA')}{window_token[:10]}{COLORS.get('RESET')} in {COLORS.get('GREEN')}{elapsed_time}{COLORS.get('RESET')} Seconds")
-                        
-                        self.results[task_id] = {"value": window_token, "elapsed_time": elapsed_time}
-                        self._save_results()
-                    else:
-                        elapsed_time = round(time.time() - start_time, 3)
-                        self.results[task_id] = {"value": "CAPTCHA_FAIL", "elapsed_time": elapsed_time}
-                        if self.debug:
-                            logger.error(f"Browser {index}: Error solving Turnstile in {COLORS.get('RED')}{elapsed_time}{COLORS.get('RESET')} Seconds")
-                except Exception as e:
-                    elapsed_time = round(time.time() - start_time, 3)
-                    self.results[task_id] = {"value": "CAPTCHA_FAIL", "elapsed_time": elapsed_time}
-                    if self.debug:
-                        logger.error(f"Browser {index}: Error in fallback check: {str(e)}")
+            # Keep clicking the widget until the callback fires, the iframe may render after the first attempts
+            solved = asyncio.ensure_future(page.wait_for_function("window.turnstileSuccess === true", timeout=10000))
+            try:
+                while not solved.done():
+                    try:
+                        await widget.click(timeout=1000)
+                    except Exception:
+                        pass
+                    await asyncio.wait([solved], timeout=0.5)
+
+                await solved
+                turnstile_check = await page.evaluate("window.turnstileToken")
+            except PlaywrightTimeoutError:
+                if self.debug:
+                    logger.debug(f"Context {index}: Callback timed out, reading Turnstile response field")
+                turnstile_check = await response_input.input_value(timeout=2000)
+            finally:
+                solved.cancel()
+
+            elapsed_time = round(time.time() - start_time, 3)
+
+            if turnstile_check:
+                logger.success(f"Context {index}: Successfully solved captcha - {COLORS.get('MAGENTA')}{turnstile_check[:10]}{COLORS.get('RESET')} in {COLORS.get('GREEN')}{elapsed_time}{COLORS.get('RESET')} Seconds")
+
+                self._store_result(task_id, TurnstileResult(turnstile_check, elapsed_time))
+            else:
+                self._store_result(task_id, TurnstileResult("CAPTCHA_FAIL", elapsed_time))
+                if self.debug:
+                    logger.error(f"Context {index}: Error solving Turnstile in {COLORS.get('RED')}{elapsed_time}{COLORS.get('RESET')} Seconds")
 
         except Exception as e:
             elapsed_time = round(time.time() - start_time, 3)
-            self.results[task_id] = {"value": "CAPTCHA_FAIL", "elapsed_time": elapsed_time}
+            self._store_result(task_id, TurnstileResult("CAPTCHA_FAIL", elapsed_time))
             if self.debug:
-                logger.error(f"Browser {index}: Error solving Turnstile: {str(e)}")
+                logger.error(f"Context {index}: Error solving Turnstile: {str(e)}")
         finally:
             if self.debug:
-                logger.debug(f"Browser {index}: Clearing page state")
+                logger.debug(f"Context {index}: Clearing page state")
+
+            if solve_context:
+                await solve_context.close()
+            elif page:
+                # The pooled context serves other callers next, so drop everything the target origin stored
+                for frame in page.frames:
+                    try:
+                        await frame.evaluate(self.CLEAR_STORAGE_SCRIPT)
+                    except Exception as e:
+                        if self.debug:
+                            logger.debug(f"Context {index}: Could not clear frame storage: {str(e)}")
 
-            await context.close()
-            await self.browser_pool.put((index, browser))
+                await page.close()
+                await context.clear_cookies()
+                await context.clear_permissions()
 
     async def process_turnstile(self):
         """Handle the /turnstile endpoint requests."""
@@ -351,36 +659,36 @@ class TurnstileAPIServer:
                 "error": "Both 'url' and 'sitekey' are required"
             }), 400
 
-        task_id = str(uuid.uuid4())
-        self.results[task_id] = "CAPTCHA_NOT_READY"
+        task_id = uuid.uuid4().hex
 
         try:
-            asyncio.create_task(self._solve_turnstile(task_id=task_id, url=url, sitekey=sitekey, action=action, cdata=cdata, proxy=proxy, useragent=useragent))
-
-            if self.debug:
-                logger.debug(f"Request completed with taskid {task_id}.")
-            return jsonify({"task_id": task_id}), 202
-        except Exception as e:
-            logger.error(f"Unexpected error processing request: {str(e)}")
+            self.jobs.put_nowait({"task_id": task_id, "url": url, "sitekey": sitekey, "action": action, "cdata": cdata, "proxy": proxy, "useragent": useragent})
+        except asyncio.QueueFull:
             return jsonify({
                 "status": "error",
-                "error": str(e)
-            }), 500
+                "error": "Solver queue is full, try again later"
+            }), 503
+
+        self._store_result(task_id, "CAPTCHA_NOT_READY", persist=False)
+
+        if self.debug:
+            logger.debug(f"Request completed with taskid {task_id}.")
+        return jsonify({"task_id": task_id}), 202
 
     async def get_result(self):
         """Return solved data"""
         task_id = request.args.get('id')
 
-        if not task_id or task_id not in self.results:
-            return jsonify({"status": "error", "error": "Invalid task ID/Request parameter"}), 400
+        result = self.results.get(task_id) if task_id else None
 
-        result = self.results[task_id]
-        status_code = 200
+        if result is None:
+            return jsonify({"status": "error", "error": "Invalid task ID/Request parameter"}), 400
 
-        if "CAPTCHA_FAIL" in result:
-            status_code = 422
+        if not isinstance(result, TurnstileResult):
+            return result, 200
 
-        return result, status_code
+        status_code = 422 if result.value == "CAPTCHA_FAIL" else 200
+        return result.body, status_code, {"Content-Type": "application/json"}
 
     @staticmethod
     async def index():
@@ -451,7 +759,7 @@ def parse_args():
     parser.add_argument('--useragent', type=str, default=None, help='Specify a custom User-Agent string for the browser. If not provided, the default User-Agent is used')
     parser.add_argument('--debug', type=bool, default=False, help='Enable or disable debug mode for additional logging and troubleshooting information (default: False)')
     parser.add_argument('--browser_type', type=str, default='chromium', help='Specify the browser type for the solver. Supported options: chromium, chrome, msedge, camoufox (default: chromium)')
-    parser.add_argument('--thread', type=int, default=1, help='Set the number of browser threads to use for multi-threaded mode. Increasing this will speed up execution but requires more resources (default: 1)')
+    parser.add_argument('--thread', type=int, default=1, help='Set the number of concurrent solves, each in its own context of a shared browser. Increasing this will speed up execution but requires more resources (default: 1)')
     parser.add_argument('--proxy', type=bool, default=False, help='Enable proxy support for the solver (Default: False)')
     parser.add_argument('--host', type=str, default='127.0.0.1', help='Specify the IP address where the API solver runs. (Default: 127.0.0.1)')
     parser.add_argument('--port', type=str, default='5000', help='Set the port for the API solver to listen on. (Default: 5000)')
@@ -475,5 +783,21 @@ if __name__ == '__main__':
     if args.browser_type not in browser_types:
         logger.error(f"Unknown browser type: {COLORS.get('RED')}{args.browser_type}{COLORS.get('RESET')} Available browser types: {browser_types}")
     else:
+        # uvloop is not available on Windows, which keeps the default asyncio loop
+        try:
+            import uvloop
+        except ImportError:
+            uvloop = None
+            logger.warning("uvloop not available, using the default asyncio event loop")
+
+        # Install the policy before create_app, asyncio objects built in __init__ bind to the loop on Python < 3.10
+        if uvloop and sys.version_info < (3, 12):
+            uvloop.install()
+
         app = create_app(headless=args.headless, debug=args.debug, useragent=args.useragent, browser_type=args.browser_type, thread=args.thread, proxy_support=args.proxy)
-        app.run(host=args.host, port=int(args.port))
+
+        if uvloop and sys.version_info >= (3, 12):
+            # uvloop.install() is deprecated on 3.12+, serve on a loop created by uvloop.run instead
+            uvloop.run(app.run_task(host=args.host, port=int(args.port)))
+        else:
+            app.run(host=args.host, port=int(args.port))